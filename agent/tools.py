@@ -6,6 +6,47 @@ import json
 from utils.store import save_json_store, load_json_store
 
 
+async def write_contract_bundle(sandbox: AsyncSandbox, project_id: str, bundle: dict) -> str:
+    """
+    Write a contract bundle into the sandbox and the project context store.
+
+    Args:
+        sandbox: Sandbox hosting the React app
+        project_id: Project whose context store should record the contract
+        bundle: { name, address, chainId, network, abi }
+
+    Returns:
+        Path of the bundle relative to the React app
+    """
+    # Ensure directory exists
+    await sandbox.commands.run(
+        "mkdir -p src/contracts",
+        cwd="/home/user/react-app",
+    )
+
+    # Write ABI bundle to sandbox
+    relative_path = f"src/contracts/{bundle['name']}.json"
+    await sandbox.files.write(f"/home/user/react-app/{relative_path}", json.dumps(bundle, indent=2))
+
+    # Save to project context on disk (server-side) for persistence
+    if project_id:
+        context = load_json_store(project_id, "context.json")
+        contracts = context.get("contracts", [])
+        # Update or append
+        updated = False
+        for i, c in enumerate(contracts):
+            if c.get("name") == bundle["name"]:
+                contracts[i] = bundle
+                updated = True
+                break
+        if not updated:
+            contracts.append(bundle)
+        context["contracts"] = contracts
+        save_json_store(project_id, "context.json", context)
+
+    return relative_path
+
+
 def create_tools_with_context(
     sandbox: AsyncSandbox, socket: WebSocket, project_id: str = None
 ):
@@ -523,12 +564,6 @@ def create_tools_with_context(
             # Parse ABI
             abi = json.loads(abi_json) if isinstance(abi_json, str) else abi_json
 
-            # Ensure directory exists
-            await sandbox.commands.run(
-                "mkdir -p src/contracts",
-                cwd="/home/user/react-app",
-            )
-
             bundle = {
                 "name": contract_name,
                 "address": contract_address,
@@ -536,26 +571,7 @@ def create_tools_with_context(
                 "network": network,
                 "abi": abi,
             }
-
-            # Write ABI bundle to sandbox
-            target_path = f"/home/user/react-app/src/contracts/{contract_name}.json"
-            await sandbox.files.write(target_path, json.dumps(bundle, indent=2))
-
-            # Save to project context on disk (server-side) for persistence
-            if project_id:
-                context = load_json_store(project_id, "context.json")
-                contracts = context.get("contracts", [])
-                # Update or append
-                updated = False
-                for i, c in enumerate(contracts):
-                    if c.get("name") == contract_name:
-                        contracts[i] = bundle
-                        updated = True
-                        break
-                if not updated:
-                    contracts.append(bundle)
-                context["contracts"] = contracts
-                save_json_store(project_id, "context.json", context)
+            await write_contract_bundle(sandbox, project_id, bundle)
 
             await safe_send_json(socket, {"e": "contract_saved", "message": f"Saved contract {contract_name} at {contract_address} on {network}"})
             return f"Saved contract info and wrote src/contracts/{contract_name}.json"
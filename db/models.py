@@ -150,6 +150,10 @@ class Contract(Base):
     # Metadata
     deployment_status: Mapped[str] = mapped_column(String(50), default="pending")  # 'pending', 'deployed', 'failed'
     
+    # Artifact cache: identical pipeline requests reuse this deployment
+    request_hash: Mapped[Optional[str]] = mapped_column(String(64), nullable=True, index=True)  # SHA-256 of canonicalized request
+    cache_version: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)  # Bumped to invalidate after backend upgrades
+    
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), default=lambda: datetime.now(timezone.utc)
     )
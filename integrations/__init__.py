@@ -3,14 +3,16 @@ Integrations Package
 Contains external service integrations for DApp creation
 """
 
-from .academic_chain_client import AcademicChainClient, get_network_info, get_explorer_url, NETWORK_CONFIG
-from .dapp_orchestrator import DAppOrchestrator, dapp_orchestrator
+from .academic_chain_client import AcademicChainClient, JobNotFound, get_network_info, get_explorer_url, NETWORK_CONFIG, SupportedNetwork
+from .dapp_orchestrator import DAppOrchestrator, get_dapp_orchestrator
 
 __all__ = [
     "AcademicChainClient",
+    "JobNotFound",
     "DAppOrchestrator",
-    "dapp_orchestrator",
+    "get_dapp_orchestrator",
     "get_network_info",
     "get_explorer_url",
-    "NETWORK_CONFIG"
+    "NETWORK_CONFIG",
+    "SupportedNetwork"
 ]
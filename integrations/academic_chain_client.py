@@ -3,9 +3,57 @@ AcademicChain API Client
 Interacts with the smart contract generation and deployment backend
 """
 import httpx
+import ijson
+import orjson
 import asyncio
-from typing import Dict, Any, Optional, List
-import json
+import random
+from functools import cached_property, lru_cache
+from types import MappingProxyType
+from typing import Dict, Any, AsyncIterator, Optional, List, Mapping, Tuple
+from datetime import datetime, timezone
+from enum import StrEnum
+from email.utils import parsedate_to_datetime
+
+
+# API endpoints (relative to the client's base_url)
+_EP_GENERATE = "/api/ai/generate"
+_EP_COMPILE = "/api/ai/compile"
+_EP_FIX = "/api/ai/fix"
+_EP_PIPELINE = "/api/ai/pipeline"
+_EP_ARTIFACTS = "/api/artifacts"
+_EP_ARTIFACT_ABIS = "/api/artifacts/abis"
+_EP_ARTIFACT_SOURCES = "/api/artifacts/sources"
+_EP_AUDIT = "/api/audit/analyze"
+_EP_COMPLIANCE = "/api/compliance/analyze"
+_EP_VERIFY_ADDRESS = "/api/verify/byAddress"
+_EP_VERIFY_JOB = "/api/verify/byJob"
+_EP_JOB = "/api/job"
+
+# Pre-built query params for the status endpoint polled in wait_for_job_completion
+_VERBOSE_PARAMS = (("verbose", "1"),)
+_QUIET_PARAMS = (("verbose", "0"),)
+
+_JSON_HEADERS = {"content-type": "application/json"}
+
+
+class JobNotFound(Exception):
+    """Raised when the backend reports a job as missing or gone (404/410)"""
+
+
+class _AsyncByteReader:
+    """Adapts an async byte iterator to the async file interface ijson expects"""
+    
+    def __init__(self, chunks: AsyncIterator[bytes]):
+        self._chunks = chunks
+    
+    async def read(self, size: int = -1) -> bytes:
+        # ijson probes with read(0) to detect bytes vs str; don't consume a chunk
+        if size == 0:
+            return b""
+        try:
+            return await self._chunks.__anext__()
+        except StopAsyncIteration:
+            return b""
 
 
 class AcademicChainClient:
@@ -13,11 +61,59 @@ class AcademicChainClient:
     
     def __init__(self, base_url: str = "https://evi-v4-production.up.railway.app"):
         self.base_url = base_url.rstrip("/")
-        self.client = httpx.AsyncClient(timeout=300.0)  # 5 min timeout for long operations
+    
+    @cached_property
+    def client(self) -> httpx.AsyncClient:
+        """
+        Pooled HTTP/2 client, built on first use inside the running loop
+
+        Polling and artifact fetches multiplex over a warm connection instead
+        of paying a TLS handshake per request.
+        """
+        limits = httpx.Limits(max_connections=100, max_keepalive_connections=50, keepalive_expiry=60)
+        return httpx.AsyncClient(
+            base_url=self.base_url,
+            http2=True,
+            limits=limits,
+            timeout=httpx.Timeout(300.0, connect=10.0)  # 5 min timeout for long operations
+        )
+    
+    async def __aenter__(self) -> "AcademicChainClient":
+        return self
+    
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
     
     async def close(self):
-        """Close the HTTP client"""
-        await self.client.aclose()
+        """Close the HTTP client (safe to call more than once)"""
+        # Don't build a client just to close it
+        if "client" in self.__dict__ and not self.client.is_closed:
+            await self.client.aclose()
+    
+    async def _send(
+        self,
+        method: str,
+        path: str,
+        payload: Optional[Dict[str, Any]] = None,
+        **kwargs: Any
+    ) -> httpx.Response:
+        """Send a request, serializing any JSON payload with orjson"""
+        if payload is not None:
+            kwargs["content"] = orjson.dumps(payload)
+            kwargs["headers"] = {**_JSON_HEADERS, **kwargs.get("headers", {})}
+        response = await self.client.request(method, path, **kwargs)
+        response.raise_for_status()
+        return response
+    
+    async def _post(self, path: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """POST a JSON payload and decode the JSON response"""
+        response = await self._send("POST", path, payload)
+        return orjson.loads(response.content)
+    
+    async def _get(self, path: str, **kwargs: Any) -> Dict[str, Any]:
+        """GET an endpoint and decode the JSON response"""
+        response = await self._send("GET", path, **kwargs)
+        return orjson.loads(response.content)
     
     # ==================== AI Generation ====================
     
@@ -36,12 +132,7 @@ class AcademicChainClient:
                 "codeBlock": {"language": str, "code": str}
             }
         """
-        response = await self.client.post(
-            f"{self.base_url}/api/ai/generate",
-            json={"prompt": prompt, "model": model}
-        )
-        response.raise_for_status()
-        return response.json()
+        return await self._post(_EP_GENERATE, {"prompt": prompt, "model": model})
     
     async def compile_contract(self, filename: str, code: str) -> Dict[str, Any]:
         """
@@ -54,12 +145,7 @@ class AcademicChainClient:
         Returns:
             Compilation result with errors if any
         """
-        response = await self.client.post(
-            f"{self.base_url}/api/ai/compile",
-            json={"filename": filename, "code": code}
-        )
-        response.raise_for_status()
-        return response.json()
+        return await self._post(_EP_COMPILE, {"filename": filename, "code": code})
     
     async def fix_contract(
         self,
@@ -85,18 +171,13 @@ class AcademicChainClient:
                 "job": {"id": str, "type": str}
             }
         """
-        response = await self.client.post(
-            f"{self.base_url}/api/ai/fix",
-            json={
-                "code": code,
-                "errors": errors,
-                "network": network,
-                "context": context,
-                "maxIters": max_iters
-            }
-        )
-        response.raise_for_status()
-        return response.json()
+        return await self._post(_EP_FIX, {
+            "code": code,
+            "errors": errors,
+            "network": network,
+            "context": context,
+            "maxIters": max_iters
+        })
     
     async def create_dapp_pipeline(
         self,
@@ -133,12 +214,7 @@ class AcademicChainClient:
         if contract_name:
             payload["contractName"] = contract_name
             
-        response = await self.client.post(
-            f"{self.base_url}/api/ai/pipeline",
-            json=payload
-        )
-        response.raise_for_status()
-        return response.json()
+        return await self._post(_EP_PIPELINE, payload)
     
     # ==================== Job Management ====================
     
@@ -157,13 +233,38 @@ class AcademicChainClient:
                 "job": dict (if verbose)
             }
         """
-        params = {"verbose": "1" if verbose else "0"}
-        response = await self.client.get(
-            f"{self.base_url}/api/job/{job_id}/status",
-            params=params
+        return await self._get(
+            f"{_EP_JOB}/{job_id}/status",
+            params=_VERBOSE_PARAMS if verbose else _QUIET_PARAMS
         )
-        response.raise_for_status()
-        return response.json()
+    
+    async def iter_job_logs(
+        self,
+        job_id: str,
+        level: Optional[str] = None,
+        limit: int = 500
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream job log entries one at a time
+        
+        The response body is parsed incrementally, so callers that only need
+        the first few entries can stop iterating without downloading or
+        decoding the rest. Callers that may stop early should wrap the
+        iterator in contextlib.aclosing() so the streamed response is
+        released right away rather than at garbage collection.
+        
+        Args:
+            job_id: Job identifier
+            level: Filter by level (info,warn,error,debug)
+            limit: Maximum logs to return
+            
+        Yields:
+            Individual log entries
+        """
+        async with self.client.stream("GET", f"{_EP_JOB}/{job_id}/logs", params=self._log_params(level, limit)) as response:
+            response.raise_for_status()
+            async for entry in ijson.items(_AsyncByteReader(response.aiter_bytes()), "logs.item"):
+                yield entry
     
     async def get_job_logs(
         self,
@@ -180,50 +281,199 @@ class AcademicChainClient:
             limit: Maximum logs to return
             
         Returns:
-            {"ok": bool, "logs": [...]}
+            The server's response: {"ok": bool, "logs": [...], ...}
+            
+        Top-level fields other than logs (ok, error, ...) are passed through
+        as sent. Once limit entries are collected the stream is closed, so
+        fields the server sends after the logs array are not read.
         """
+        result: Dict[str, Any] = {}
+        logs: List[Any] = []
+        builder, target, depth = None, None, 0
+        
+        async with self.client.stream("GET", f"{_EP_JOB}/{job_id}/logs", params=self._log_params(level, limit)) as response:
+            response.raise_for_status()
+            async for prefix, event, value in ijson.parse(_AsyncByteReader(response.aiter_bytes())):
+                if builder is None:
+                    # Start building at each log entry or any other top-level member
+                    if prefix != "logs.item" and (not prefix or "." in prefix or prefix == "logs"):
+                        continue
+                    builder, target = ijson.ObjectBuilder(), prefix
+                builder.event(event, value)
+                if event in ("start_map", "start_array"):
+                    depth += 1
+                elif event in ("end_map", "end_array"):
+                    depth -= 1
+                if depth:
+                    continue
+                
+                if target == "logs.item":
+                    logs.append(builder.value)
+                else:
+                    result[target] = builder.value
+                builder = None
+                if len(logs) >= limit:
+                    break
+        
+        result["logs"] = logs
+        return result
+    
+    @staticmethod
+    def _log_params(level: Optional[str], limit: int) -> Dict[str, Any]:
+        """Query params shared by the log endpoints"""
         params = {"limit": limit}
         if level:
             params["level"] = level
-            
-        response = await self.client.get(
-            f"{self.base_url}/api/job/{job_id}/logs",
-            params=params
-        )
-        response.raise_for_status()
-        return response.json()
+        return params
+    
+    async def _poll_once(self, job_id: str) -> Tuple[Dict[str, Any], httpx.Headers]:
+        """Fetch verbose job status, keeping the response headers for scheduling hints"""
+        response = await self._send("GET", f"{_EP_JOB}/{job_id}/status", params=_VERBOSE_PARAMS)
+        return orjson.loads(response.content), response.headers
+    
+    @staticmethod
+    def _seconds_until(value: Any) -> Optional[float]:
+        """
+        Convert an ETA into seconds from now
+        
+        Accepts a datetime, an ISO-8601 string, an epoch timestamp in seconds
+        or milliseconds, or a small number meaning seconds remaining.
+        """
+        now = datetime.now(timezone.utc)
+        if isinstance(value, str) and value:
+            try:
+                value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+            except ValueError:
+                return None
+        if isinstance(value, datetime):
+            eta = value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+            return max(0.0, (eta - now).total_seconds())
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            # Anything before 2001 can't be a real epoch ETA; read it as seconds remaining
+            if value < 1e9:
+                return max(0.0, float(value))
+            # Treat large values as JS-style millisecond timestamps
+            timestamp = value / 1000 if value > 1e11 else value
+            return max(0.0, timestamp - now.timestamp())
+        return None
+    
+    @classmethod
+    def _server_delay_hint(cls, status: Dict[str, Any], headers: httpx.Headers) -> Optional[float]:
+        """
+        Extract the server's own estimate of when to poll next
+        
+        Prefers a Retry-After header (delta-seconds or HTTP-date), then an
+        estimatedCompletionTime / eta field on the status payload or its job.
+        """
+        retry_after = headers.get("retry-after")
+        if retry_after:
+            try:
+                return max(0.0, float(retry_after))
+            except ValueError:
+                try:
+                    return cls._seconds_until(parsedate_to_datetime(retry_after))
+                except (TypeError, ValueError):
+                    pass
+        
+        job = status.get("job") or {}
+        for source in (status, job):
+            for key in ("estimatedCompletionTime", "eta"):
+                if source.get(key) is not None:
+                    delay = cls._seconds_until(source[key])
+                    if delay is not None:
+                        return delay
+        return None
+    
+    @staticmethod
+    def _next_delay(hint: Optional[float], current_delay: float, max_interval: float) -> float:
+        """
+        Combine a server hint with the computed back-off
+        
+        The hint can only lengthen the sleep (up to max_interval). A hint of
+        zero, such as an ETA that has already passed or Retry-After: 0, falls
+        back to the back-off instead of re-polling immediately.
+        """
+        if hint is None:
+            return current_delay
+        return max(current_delay, min(hint, max_interval))
     
     async def wait_for_job_completion(
         self,
         job_id: str,
-        poll_interval: float = 2.0,
-        timeout: float = 300.0
+        initial_interval: float = 0.3,
+        backoff: float = 1.5,
+        max_interval: float = 5.0,
+        timeout: float = 300.0,
+        max_transient_errors: int = 3
     ) -> Dict[str, Any]:
         """
         Poll job until completion or timeout
         
+        The first poll is immediate; re-polls start after initial_interval and
+        the interval grows geometrically (with a little jitter) up to
+        max_interval. Sleeps are clamped to the time left before timeout. When
+        the server hints at completion time (Retry-After header or an ETA
+        field), the hint can lengthen the computed delay, up to max_interval,
+        but never shorten it.
+        
+        A 404/410 or other 4xx response fails immediately. 429, 5xx responses
+        and network errors are retried on the same back-off schedule (or after
+        a longer Retry-After on the error response, capped at max_interval), up to
+        max_transient_errors in a row.
+        
         Args:
             job_id: Job identifier
-            poll_interval: Seconds between polls
+            initial_interval: Seconds before the first re-poll
+            backoff: Multiplier applied to the delay after each poll
+            max_interval: Upper bound on the delay between polls
             timeout: Maximum wait time
+            max_transient_errors: Consecutive 429/5xx/network failures tolerated
             
         Returns:
             Final job status
+            
+        Raises:
+            JobNotFound: The backend no longer knows about the job
+            TimeoutError: The job did not finish within timeout
         """
-        start_time = asyncio.get_event_loop().time()
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        current_delay = initial_interval
+        transient_errors = 0
         
         while True:
-            elapsed = asyncio.get_event_loop().time() - start_time
-            if elapsed > timeout:
+            if loop.time() > deadline:
                 raise TimeoutError(f"Job {job_id} did not complete within {timeout}s")
             
-            status = await self.get_job_status(job_id, verbose=True)
+            try:
+                status, headers = await self._poll_once(job_id)
+            except (httpx.HTTPStatusError, httpx.TransportError) as e:
+                hint = None
+                if isinstance(e, httpx.HTTPStatusError):
+                    code = e.response.status_code
+                    if code in (404, 410):
+                        raise JobNotFound(f"Job {job_id} not found (HTTP {code})") from e
+                    if code < 500 and code != 429:
+                        raise
+                    # 429/503 are where servers actually send Retry-After
+                    hint = self._server_delay_hint({}, e.response.headers)
+                # Rate limit, 5xx or network error: retry a few times before giving up
+                transient_errors += 1
+                if transient_errors >= max_transient_errors:
+                    raise
+                delay = self._next_delay(hint, current_delay, max_interval)
+                await asyncio.sleep(min(delay, max(0.0, deadline - loop.time())))
+                current_delay = min(current_delay * backoff + random.uniform(0, 0.1), max_interval)
+                continue
+            transient_errors = 0
             
             job_status = status.get("status", "pending")
             if job_status in ["completed", "failed"]:
                 return status
             
-            await asyncio.sleep(poll_interval)
+            delay = self._next_delay(self._server_delay_hint(status, headers), current_delay, max_interval)
+            await asyncio.sleep(min(delay, max(0.0, deadline - loop.time())))
+            current_delay = min(current_delay * backoff + random.uniform(0, 0.1), max_interval)
     
     # ==================== Artifacts ====================
     
@@ -247,13 +497,11 @@ class AcademicChainClient:
                 "scripts": {...}
             }
         """
-        response = await self.client.get(
-            f"{self.base_url}/api/artifacts",
+        return await self._get(
+            _EP_ARTIFACTS,
             headers={"x-job-id": job_id},
             params={"include": include}
         )
-        response.raise_for_status()
-        return response.json()
     
     async def get_contract_abi(self, job_id: str) -> Dict[str, Any]:
         """
@@ -265,12 +513,7 @@ class AcademicChainClient:
         Returns:
             {"ok": bool, "abis": {"ContractName": [...]}}
         """
-        response = await self.client.get(
-            f"{self.base_url}/api/artifacts/abis",
-            headers={"x-job-id": job_id}
-        )
-        response.raise_for_status()
-        return response.json()
+        return await self._get(_EP_ARTIFACT_ABIS, headers={"x-job-id": job_id})
     
     async def get_contract_source(self, job_id: str) -> Dict[str, Any]:
         """
@@ -282,12 +525,7 @@ class AcademicChainClient:
         Returns:
             {"ok": bool, "sources": {"FileName.sol": "code..."}}
         """
-        response = await self.client.get(
-            f"{self.base_url}/api/artifacts/sources",
-            headers={"x-job-id": job_id}
-        )
-        response.raise_for_status()
-        return response.json()
+        return await self._get(_EP_ARTIFACT_SOURCES, headers={"x-job-id": job_id})
     
     # ==================== Audit & Compliance ====================
     
@@ -308,12 +546,7 @@ class AcademicChainClient:
         Returns:
             Audit report with vulnerabilities
         """
-        response = await self.client.post(
-            f"{self.base_url}/api/audit/analyze",
-            json={"code": code, "filename": filename, "model": model}
-        )
-        response.raise_for_status()
-        return response.json()
+        return await self._post(_EP_AUDIT, {"code": code, "filename": filename, "model": model})
     
     async def check_compliance(
         self,
@@ -332,12 +565,7 @@ class AcademicChainClient:
         Returns:
             Compliance report
         """
-        response = await self.client.post(
-            f"{self.base_url}/api/compliance/analyze",
-            json={"code": code, "profile": profile, "filename": filename}
-        )
-        response.raise_for_status()
-        return response.json()
+        return await self._post(_EP_COMPLIANCE, {"code": code, "profile": profile, "filename": filename})
     
     # ==================== Verification ====================
     
@@ -370,12 +598,7 @@ class AcademicChainClient:
         if constructor_args:
             payload["args"] = constructor_args
             
-        response = await self.client.post(
-            f"{self.base_url}/api/verify/byAddress",
-            json=payload
-        )
-        response.raise_for_status()
-        return response.json()
+        return await self._post(_EP_VERIFY_ADDRESS, payload)
     
     async def verify_by_job(
         self,
@@ -402,35 +625,38 @@ class AcademicChainClient:
         if fully_qualified_name:
             payload["fullyQualifiedName"] = fully_qualified_name
             
-        response = await self.client.post(
-            f"{self.base_url}/api/verify/byJob",
-            json=payload
-        )
-        response.raise_for_status()
-        return response.json()
+        return await self._post(_EP_VERIFY_JOB, payload)
 
 
 # Network configuration helpers
-NETWORK_CONFIG = {
-    "basecamp-testnet": {
+class SupportedNetwork(StrEnum):
+    """Supported network names; members compare and hash equal to their value"""
+    BASECAMP_TESTNET = "basecamp-testnet"
+    SEPOLIA = "sepolia"
+    POLYGON = "polygon"
+    AVALANCHE_FUJI = "avalanche-fuji"
+
+
+_NETWORK_CONFIG = {
+    SupportedNetwork.BASECAMP_TESTNET: {
         "chain_id": 84532,
         "name": "Base Camp Testnet",
         "rpc": "https://sepolia.base.org",
         "explorer": "https://sepolia.basescan.org"
     },
-    "sepolia": {
+    SupportedNetwork.SEPOLIA: {
         "chain_id": 11155111,
         "name": "Ethereum Sepolia",
         "rpc": "https://ethereum-sepolia-rpc.publicnode.com",
         "explorer": "https://sepolia.etherscan.io"
     },
-    "polygon": {
+    SupportedNetwork.POLYGON: {
         "chain_id": 137,
         "name": "Polygon",
         "rpc": "https://polygon.llamarpc.com",
         "explorer": "https://polygonscan.com"
     },
-    "avalanche-fuji": {
+    SupportedNetwork.AVALANCHE_FUJI: {
         "chain_id": 43113,
         "name": "Avalanche Fuji",
         "rpc": "https://api.avax-test.network/ext/bc/C/rpc",
@@ -439,14 +665,24 @@ NETWORK_CONFIG = {
 }
 
 
-def get_network_info(network: str) -> Dict[str, Any]:
+# Read-only views so cached lookups can't be mutated by callers
+NETWORK_CONFIG: Mapping[str, Mapping[str, Any]] = MappingProxyType({
+    name: MappingProxyType(config) for name, config in _NETWORK_CONFIG.items()
+})
+
+_EXPLORERS = {name: config["explorer"] for name, config in NETWORK_CONFIG.items()}
+_EMPTY_NETWORK: Mapping[str, Any] = MappingProxyType({})
+
+
+@lru_cache(maxsize=32)
+def get_network_info(network: str) -> Mapping[str, Any]:
     """Get network configuration by name"""
-    return NETWORK_CONFIG.get(network, {})
+    return NETWORK_CONFIG.get(network, _EMPTY_NETWORK)
 
 
 def get_explorer_url(network: str, address: str) -> str:
     """Generate block explorer URL for contract"""
-    config = get_network_info(network)
-    if not config:
+    explorer = _EXPLORERS.get(network)
+    if not explorer:
         return ""
-    return f"{config['explorer']}/address/{address}"
+    return f"{explorer}/address/{address}"
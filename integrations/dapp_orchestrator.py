@@ -3,17 +3,28 @@ DApp Orchestration Service
 Coordinates smart contract deployment (AcademicChain) with frontend generation (WebBuilder)
 """
 import asyncio
+import hashlib
 import uuid
 import json
-from typing import Dict, Any, Optional
+from functools import cached_property, lru_cache
+from typing import Dict, Any, Optional, Tuple
+from e2b_code_interpreter import AsyncSandbox
 from fastapi import WebSocket
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
-from .academic_chain_client import AcademicChainClient, get_explorer_url
+from .academic_chain_client import AcademicChainClient, NETWORK_CONFIG, get_explorer_url, get_network_info
 from agent.service import Service as WebBuilderService
+from agent.tools import write_contract_bundle
 from db.models import Chat, Contract, Message
 
+# Bump when the AcademicChain backend changes in a way that invalidates
+# previously deployed contracts for the same request
+ARTIFACT_CACHE_VERSION = 1
+
+# Upper bound on undelivered status updates per socket
+STATUS_QUEUE_SIZE = 100
+
 
 class DAppOrchestrator:
     """
@@ -24,10 +35,22 @@ class DAppOrchestrator:
     
     def __init__(self):
         self.academic_chain = AcademicChainClient()
-        self.webbuilder = WebBuilderService()
+        # Per-socket (queue, writer task) pairs for status updates
+        self._status_writers: Dict[int, Tuple[asyncio.Queue, asyncio.Task]] = {}
+    
+    @cached_property
+    def webbuilder(self) -> WebBuilderService:
+        """WebBuilder service, constructed only once a frontend is needed"""
+        return WebBuilderService()
+    
+    async def __aenter__(self) -> "DAppOrchestrator":
+        return self
+    
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
     
     async def close(self):
-        """Clean up resources"""
+        """Clean up resources (safe to call more than once)"""
         await self.academic_chain.close()
     
     async def create_full_dapp(
@@ -64,6 +87,10 @@ class DAppOrchestrator:
                 "error": str (if failed)
             }
         """
+        # Reject unknown networks before spending a full pipeline run on them
+        if network not in NETWORK_CONFIG:
+            return {"success": False, "error": f"Unsupported network {network!r}"}
+        
         try:
             # Send initial status
             if socket:
@@ -73,66 +100,72 @@ class DAppOrchestrator:
             if socket:
                 await self._send_status(socket, "contract_generating", "Generating smart contract with AI...")
             
-            # Start contract pipeline
-            pipeline_result = await self.academic_chain.create_dapp_pipeline(
-                prompt=prompt,
-                network=network,
-                max_iters=3
-            )
-            
-            job_id = pipeline_result["job"]["id"]
-            
-            if socket:
-                await self._send_status(
-                    socket, 
-                    "contract_deploying", 
-                    f"Contract pipeline started (Job: {job_id}). Compiling and deploying..."
+            # Identical requests reuse a previously deployed contract
+            request_hash = self._request_hash(prompt=prompt, network=network)
+            cached = await self._get_cached_contract(db, request_hash)
+            
+            if cached:
+                job_id = cached.job_id
+                contract_address = cached.contract_address
+                contract_abi = cached.abi
+                source_code = cached.source_code
+                contract_name = cached.contract_name
+                deploy_tx_hash = cached.deploy_tx_hash
+            else:
+                # Start contract pipeline
+                pipeline_result = await self.academic_chain.create_dapp_pipeline(
+                    prompt=prompt,
+                    network=network,
+                    max_iters=3
                 )
             
-            # Wait for deployment to complete
-            final_status = await self.academic_chain.wait_for_job_completion(
-                job_id=job_id,
-                poll_interval=3.0,
-                timeout=300.0
-            )
+                job_id = pipeline_result["job"]["id"]
             
-            if final_status.get("status") != "completed":
-                error_msg = "Contract deployment failed"
                 if socket:
-                    await self._send_status(socket, "contract_failed", error_msg)
-                return {"success": False, "error": error_msg, "job_id": job_id}
+                    await self._send_status(
+                        socket, 
+                        "contract_deploying", 
+                        f"Contract pipeline started (Job: {job_id}). Compiling and deploying..."
+                    )
+            
+                # Wait for deployment to complete
+                final_status = await self.academic_chain.wait_for_job_completion(
+                    job_id=job_id,
+                    timeout=300.0
+                )
             
-            # Get deployment artifacts
-            artifacts = await self.academic_chain.get_artifacts(job_id)
+                if final_status.get("status") != "completed":
+                    error_msg = "Contract deployment failed"
+                    if socket:
+                        await self._send_status(socket, "contract_failed", error_msg)
+                    return {"success": False, "error": error_msg, "job_id": job_id}
             
-            # Extract contract info from job payload
-            job_data = final_status.get("job", {})
-            deployment_data = job_data.get("result", {})
+                # Extract contract info from job payload
+                job_data = final_status.get("job", {})
+                deployment_data = job_data.get("result", {})
             
-            contract_address = deployment_data.get("address")
-            if not contract_address:
-                error_msg = "Contract address not found in deployment result"
-                if socket:
-                    await self._send_status(socket, "contract_failed", error_msg)
-                return {"success": False, "error": error_msg, "job_id": job_id}
+                contract_address = deployment_data.get("address")
+                if not contract_address:
+                    error_msg = "Contract address not found in deployment result"
+                    if socket:
+                        await self._send_status(socket, "contract_failed", error_msg)
+                    return {"success": False, "error": error_msg, "job_id": job_id}
             
-            # Get ABI
-            abi_data = await self.academic_chain.get_contract_abi(job_id)
-            abis = abi_data.get("abis", {})
-            contract_abi = list(abis.values())[0] if abis else []
+                # A single include=all request already carries ABIs and sources
+                artifacts = await self.academic_chain.get_artifacts(job_id)
             
-            # Get source code
-            source_data = await self.academic_chain.get_contract_source(job_id)
-            sources = source_data.get("sources", {})
-            source_code = list(sources.values())[0] if sources else ""
+                abis = artifacts.get("abis", {})
+                sources = artifacts.get("sources", {})
+                contract_abi = next(iter(abis.values()), [])
+                source_code = next(iter(sources.values()), "")
             
-            # Determine contract name
-            contract_name = deployment_data.get("name", "DAppContract")
+                # Determine contract name
+                contract_name = deployment_data.get("name", "DAppContract")
+                deploy_tx_hash = deployment_data.get("transactionHash")
             
             # Get network info
-            from .academic_chain_client import get_network_info
             network_info = get_network_info(network)
-            chain_id = network_info.get("chain_id", 0)
+            chain_id = network_info["chain_id"]
             
             explorer_url = get_explorer_url(network, contract_address)
             
@@ -154,15 +187,14 @@ class DAppOrchestrator:
                 abi=contract_abi,
                 source_code=source_code,
                 job_id=job_id,
-                deploy_tx_hash=deployment_data.get("transactionHash"),
+                deploy_tx_hash=deploy_tx_hash,
                 verified=False,
                 explorer_url=explorer_url,
-                deployment_status="deployed"
+                deployment_status="deployed",
+                request_hash=request_hash,
+                cache_version=ARTIFACT_CACHE_VERSION
             )
             
-            db.add(contract)
-            await db.commit()
-            
             # Store contract info in message history
             contract_message = Message(
                 id=str(uuid.uuid4()),
@@ -171,7 +203,9 @@ class DAppOrchestrator:
                 content=f"Smart contract deployed successfully!\n\nAddress: {contract_address}\nNetwork: {network}\nExplorer: {explorer_url}",
                 event_type="contract_deployed"
             )
-            db.add(contract_message)
+            
+            # Both rows only reference the chat, so one commit covers them
+            db.add_all([contract, contract_message])
             await db.commit()
             
             # If contract-only mode, return here
@@ -206,16 +240,29 @@ class DAppOrchestrator:
             
             # Run WebBuilder agent
             # Note: This uses the existing run_agent_stream which expects WebSocket
-            # The agent will automatically use the new tools (save_contract_info, create_web3_boilerplate)
+            # The agent will automatically use the new tools (create_web3_boilerplate, get_deployed_contracts)
             
-            # We need to pass contract info to the agent through the enhanced prompt
-            # The agent's prompt already instructs it to handle Web3 setup when it sees contract info
+            # The full ABI is written into the sandbox before the agent starts;
+            # the enhanced prompt only carries function signatures and the bundle path
             
             if socket:
                 await self._send_status(socket, "frontend_building", "Building UI components...")
             
             # Get sandbox and run agent
             sandbox = await self.webbuilder.get_e2b_sandbox(chat_id)
+            await self._publish_contract(
+                sandbox,
+                chat_id=chat_id,
+                contract_name=contract_name,
+                contract_address=contract_address,
+                chain_id=chain_id,
+                network=network,
+                abi=contract_abi
+            )
+            
+            # Deliver queued statuses before the agent starts writing to the socket
+            if socket:
+                await self._flush_status(socket)
             
             # Run the agent workflow (this will generate the frontend)
             # The socket messages from the agent will stream to the user automatically
@@ -227,9 +274,8 @@ class DAppOrchestrator:
             )
             
             # Get the app URL (should be set by the agent service)
-            result = await db.execute(select(Chat).where(Chat.id == chat_id))
-            chat = result.scalar_one_or_none()
-            frontend_url = chat.app_url if chat else f"https://{chat_id}.e2b.dev"
+            result = await db.execute(select(Chat.app_url).where(Chat.id == chat_id))
+            frontend_url = result.scalar_one_or_none() or f"https://{chat_id}.e2b.dev"
             
             if socket:
                 await self._send_status(
@@ -258,6 +304,9 @@ class DAppOrchestrator:
                 "success": False,
                 "error": error_msg
             }
+        finally:
+            if socket:
+                await self._flush_status(socket)
     
     async def create_frontend_for_existing_contract(
         self,
@@ -284,14 +333,16 @@ class DAppOrchestrator:
         Returns:
             {"success": bool, "frontend_url": str, "error": str}
         """
+        if network not in NETWORK_CONFIG:
+            return {"success": False, "error": f"Unsupported network {network!r}"}
+        
         try:
             if socket:
                 await self._send_status(socket, "starting", "Creating frontend for existing contract...")
             
             # Get network info
-            from .academic_chain_client import get_network_info
             network_info = get_network_info(network)
-            chain_id = network_info.get("chain_id", 0)
+            chain_id = network_info["chain_id"]
             
             # Create frontend prompt with contract details
             frontend_prompt = self._create_frontend_prompt(
@@ -324,6 +375,18 @@ class DAppOrchestrator:
             
             # Run WebBuilder
             sandbox = await self.webbuilder.get_e2b_sandbox(chat_id)
+            await self._publish_contract(
+                sandbox,
+                chat_id=chat_id,
+                contract_name="Contract",
+                contract_address=contract_address,
+                chain_id=chain_id,
+                network=network,
+                abi=abi
+            )
+            
+            if socket:
+                await self._flush_status(socket)
             
             await self.webbuilder.run_agent_stream(
                 id=chat_id,
@@ -333,9 +396,8 @@ class DAppOrchestrator:
             )
             
             # Get frontend URL
-            result = await db.execute(select(Chat).where(Chat.id == chat_id))
-            chat = result.scalar_one_or_none()
-            frontend_url = chat.app_url if chat else f"https://{chat_id}.e2b.dev"
+            result = await db.execute(select(Chat.app_url).where(Chat.id == chat_id))
+            frontend_url = result.scalar_one_or_none() or f"https://{chat_id}.e2b.dev"
             
             return {
                 "success": True,
@@ -348,6 +410,83 @@ class DAppOrchestrator:
                 "success": False,
                 "error": str(e)
             }
+        finally:
+            if socket:
+                await self._flush_status(socket)
+    
+    @staticmethod
+    def _request_hash(
+        prompt: str,
+        network: str,
+        constructor_args: Optional[list] = None,
+        contract_name: Optional[str] = None
+    ) -> str:
+        """SHA-256 of the canonicalized contract pipeline request"""
+        canonical = json.dumps(
+            {"prompt": prompt, "network": network, "args": constructor_args, "name": contract_name},
+            sort_keys=True
+        )
+        return hashlib.sha256(canonical.encode()).hexdigest()
+    
+    async def _get_cached_contract(self, db: AsyncSession, request_hash: str) -> Optional[Contract]:
+        """Find a successfully deployed contract for an identical earlier request"""
+        result = await db.execute(
+            select(Contract)
+            .where(
+                Contract.request_hash == request_hash,
+                Contract.cache_version == ARTIFACT_CACHE_VERSION,
+                Contract.deployment_status == "deployed",
+                Contract.contract_address != ""
+            )
+            .order_by(Contract.created_at.desc())
+            .limit(1)
+        )
+        return result.scalar_one_or_none()
+    
+    async def _publish_contract(
+        self,
+        sandbox: AsyncSandbox,
+        chat_id: str,
+        contract_name: str,
+        contract_address: str,
+        chain_id: int,
+        network: str,
+        abi: list
+    ) -> str:
+        """
+        Write the contract bundle (including the full ABI) into the sandbox
+        so the agent can import it instead of receiving it in the prompt
+        """
+        return await write_contract_bundle(sandbox, chat_id, {
+            "name": contract_name,
+            "address": contract_address,
+            "chainId": chain_id,
+            "network": network,
+            "abi": abi,
+        })
+    
+    @staticmethod
+    def _summarize_abi(abi: list) -> str:
+        """
+        One line per ABI function or event
+        
+        Functions render as name(inputs) -> outputs [stateMutability] and
+        events as event Name(inputs). Human-readable ABI entries (plain
+        strings such as "function balanceOf(address) view returns (uint256)")
+        are already signatures and are passed through verbatim.
+        """
+        lines = []
+        for entry in abi:
+            if not isinstance(entry, dict):
+                lines.append(f"  - {entry}")
+                continue
+            inputs = ",".join(i["type"] for i in entry.get("inputs", []))
+            if entry.get("type") == "function":
+                outputs = ",".join(o["type"] for o in entry.get("outputs", []))
+                lines.append(f"  - {entry.get('name', '')}({inputs}) -> {outputs} [{entry.get('stateMutability', '')}]")
+            elif entry.get("type") == "event":
+                lines.append(f"  - event {entry.get('name', '')}({inputs})")
+        return "\n".join(lines)
     
     def _create_frontend_prompt(
         self,
@@ -360,6 +499,9 @@ class DAppOrchestrator:
     ) -> str:
         """
         Create enhanced prompt for frontend generation with contract details
+        
+        Only function signatures are inlined; the full ABI is written to
+        src/contracts/{contract_name}.json by _publish_contract.
         """
         return f"""
 Build a Web3 React frontend for the following smart contract:
@@ -368,14 +510,16 @@ CONTRACT DETAILS:
 - Name: {contract_name}
 - Address: {contract_address}
 - Network: {network} (Chain ID: {chain_id})
-- ABI: {json.dumps(abi, indent=2)}
+- Full ABI bundle: src/contracts/{contract_name}.json (already written; contains address, chainId, network, abi)
+- Functions and events:
+{self._summarize_abi(abi)}
 
 ORIGINAL REQUEST:
 {original_prompt}
 
 REQUIREMENTS:
 1. Use the create_web3_boilerplate() tool to set up wagmi and RainbowKit
-2. Use the save_contract_info() tool to save the contract details
+2. Import the ABI and address from src/contracts/{contract_name}.json (do not call save_contract_info() again)
 3. Build a modern, responsive UI with:
    - Wallet connection button (prominent in header)
    - Read functions displayed in cards/sections
@@ -390,15 +534,52 @@ Make the UI intuitive and user-friendly for Web3 interactions.
 """
     
     async def _send_status(self, socket: WebSocket, event: str, message: str):
-        """Send status update via WebSocket"""
+        """
+        Queue a status update for the socket's writer task
+
+        Returns immediately so pipeline progress isn't gated on socket
+        throughput. The queue is bounded; updates are dropped if a stalled
+        socket lets it fill up.
+        """
+        writer = self._status_writers.get(id(socket))
+        if writer is None:
+            queue: asyncio.Queue = asyncio.Queue(maxsize=STATUS_QUEUE_SIZE)
+            task = asyncio.create_task(self._drain_status(socket, queue))
+            writer = self._status_writers[id(socket)] = (queue, task)
+        
         try:
-            await socket.send_json({
+            writer[0].put_nowait({
                 "e": event,
                 "message": message
             })
-        except Exception as e:
-            print(f"Failed to send WebSocket message: {e}")
+        except asyncio.QueueFull:
+            print(f"Dropping WebSocket status '{event}': send queue full")
+    
+    @staticmethod
+    async def _drain_status(socket: WebSocket, queue: asyncio.Queue):
+        """Send queued status updates in order until the None sentinel"""
+        while (payload := await queue.get()) is not None:
+            try:
+                await socket.send_json(payload)
+            except Exception as e:
+                print(f"Failed to send WebSocket message: {e}")
+    
+    async def _flush_status(self, socket: WebSocket):
+        """Wait for all queued status updates to be sent and stop the writer"""
+        writer = self._status_writers.pop(id(socket), None)
+        if writer is None:
+            return
+        queue, task = writer
+        try:
+            await queue.put(None)
+            await task
+        except asyncio.CancelledError:
+            # Caller is being torn down (e.g. socket closed); don't leave the writer waiting
+            task.cancel()
+            raise
 
 
-# Singleton instance
-dapp_orchestrator = DAppOrchestrator()
+@lru_cache(maxsize=1)
+def get_dapp_orchestrator() -> DAppOrchestrator:
+    """Shared orchestrator instance, created on first use rather than at import"""
+    return DAppOrchestrator()
@@ -18,11 +18,21 @@ from auth.dependencies import get_current_user
 from sqlalchemy.ext.asyncio import AsyncSession
 from db.base import get_db
 import uuid
+from contextlib import asynccontextmanager
 
 from auth.utils import decode_token
+from integrations import SupportedNetwork
+from integrations.dapp_orchestrator import get_dapp_orchestrator
 
 
-app = FastAPI(title="lovable")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Release the AcademicChain connection pool on shutdown
+    await get_dapp_orchestrator().close()
+
+
+app = FastAPI(title="lovable", lifespan=lifespan)
 
 origins = [
     "http://localhost:3000",
@@ -394,14 +404,14 @@ async def list_user_projects(
 
 class DAppPayload(BaseModel):
     prompt: str
-    network: str = "basecamp-testnet"  # Default to testnet
+    network: SupportedNetwork = SupportedNetwork.BASECAMP_TESTNET  # Default to testnet
     contract_only: bool = False  # If True, only deploy contract
 
 
 class FrontendForContractPayload(BaseModel):
     contract_address: str
     abi: list
-    network: str
+    network: SupportedNetwork
     prompt: str  # Description of desired UI
 
 
@@ -452,7 +462,6 @@ async def create_dapp(
     await db.commit()
     
     # Start DApp creation in background
-    from integrations.dapp_orchestrator import dapp_orchestrator
     
     async def dapp_creation_task():
         try:
@@ -461,7 +470,7 @@ async def create_dapp(
             
             socket = active_sockets[chat_id]
             
-            result = await dapp_orchestrator.create_full_dapp(
+            result = await get_dapp_orchestrator().create_full_dapp(
                 db=db,
                 chat_id=chat_id,
                 prompt=payload.prompt,
@@ -539,7 +548,6 @@ async def create_frontend_for_existing_contract(
     await db.commit()
     
     # Start frontend creation
-    from integrations.dapp_orchestrator import dapp_orchestrator
     
     async def frontend_task():
         try:
@@ -548,7 +556,7 @@ async def create_frontend_for_existing_contract(
             
             socket = active_sockets[chat_id]
             
-            result = await dapp_orchestrator.create_frontend_for_existing_contract(
+            result = await get_dapp_orchestrator().create_frontend_for_existing_contract(
                 db=db,
                 chat_id=chat_id,
                 contract_address=payload.contract_address,
@@ -0,0 +1,11 @@
+-- Migration: Add artifact cache columns to contracts table
+-- Lets identical DApp requests reuse an already deployed contract
+
+ALTER TABLE contracts ADD COLUMN IF NOT EXISTS request_hash VARCHAR(64);
+ALTER TABLE contracts ADD COLUMN IF NOT EXISTS cache_version INTEGER;
+
+CREATE INDEX IF NOT EXISTS idx_contracts_request_hash ON contracts (request_hash);
+
+-- Comments for documentation
+COMMENT ON COLUMN contracts.request_hash IS 'SHA-256 of the canonicalized pipeline request (prompt, network, args, name)';
+COMMENT ON COLUMN contracts.cache_version IS 'Artifact cache version; rows with an older version are ignored';
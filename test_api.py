@@ -4,255 +4,441 @@ Comprehensive Test Suite for WebBuilder API
 Tests authentication, project creation, and DApp building functionality
 """
 
+import argparse
 import asyncio
 import httpx
+import ijson
 import json
+import logging
+import logging.handlers
+import orjson
 import os
+import sys
+from contextlib import nullcontext
+from typing import Optional
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Buffer log records and write them in one go (at capacity, on an error, or at
+# shutdown) so concurrent tests don't each stall on a synchronous stdout write
+_stream_handler = logging.StreamHandler(sys.stderr)
+_stream_handler.setFormatter(logging.Formatter("%(message)s"))
+_log_buffer = logging.handlers.MemoryHandler(
+    capacity=1000, flushLevel=logging.ERROR, target=_stream_handler
+)
+log = logging.getLogger("webbuilder-test")
+log.setLevel(logging.INFO)
+log.addHandler(_log_buffer)
+log.propagate = False
+
 BASE_URL = os.getenv("API_BASE_URL", "http://localhost:8000")
 TEST_EMAIL = "test@example.com"
 TEST_PASSWORD = "testpassword123"
 TEST_NAME = "Test User"
+JSON_HEADERS = {"content-type": "application/json"}
+# The signup payload never changes, so serialize it once
+_SIGNUP_BODY = orjson.dumps({"email": TEST_EMAIL, "password": TEST_PASSWORD, "name": TEST_NAME})
+TOKEN_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".test_cache.json")
+# Semicolon-separated prompts; all run in one event loop so the pooled
+# connection and auth token are reused across scenarios
+PROMPTS = [
+    p.strip()
+    for p in os.getenv("TEST_PROMPTS", "Create a beautiful todo list app with dark mode").split(";")
+    if p.strip()
+]
+
+
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Process-wide client so every tester shares one connection pool"""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        # HTTP/2 is negotiated via ALPN on https:// deployments; plain http://
+        # (local uvicorn) transparently stays on HTTP/1.1 with the same pool
+        _http_client = httpx.AsyncClient(
+            base_url=BASE_URL,
+            timeout=60.0,
+            http2=True,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=300)
+        )
+    return _http_client
+
+
+async def close_http_client():
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
 
 
 class WebBuilderTester:
     def __init__(self):
-        self.client = httpx.AsyncClient(base_url=BASE_URL, timeout=60.0)
+        self.client = get_http_client()
         self.token = None
         self.user_id = None
         self.chat_id = None
+        self.results: list[tuple[str, bool, str]] = []
+        # Per-request concurrency limit, set by run_load
+        self._limit: Optional[asyncio.Semaphore] = None
 
     async def close(self):
-        await self.client.aclose()
+        # The HTTP client is shared; close_http_client() releases it at shutdown
+        pass
+
+    def _set_token(self, token: str):
+        self.token = token
+        # Every later request inherits the header from the client; the value is
+        # encoded once here (Headers.update accepts bytes, __setitem__ does not)
+        self.client.headers.update({b"authorization": f"Bearer {token}".encode()})
+
+    def _load_cached_token(self):
+        """Return a token saved by a previous run against the same server and user"""
+        try:
+            with open(TOKEN_CACHE_PATH) as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if cache.get("base_url") != BASE_URL or cache.get("email") != TEST_EMAIL:
+            return None
+        return cache.get("token")
+
+    def _save_cached_token(self):
+        with open(TOKEN_CACHE_PATH, "w") as f:
+            json.dump({"base_url": BASE_URL, "email": TEST_EMAIL, "token": self.token}, f)
+
+    async def authenticate(self):
+        """
+        Authenticate, reusing a cached token when it is still valid
+
+        An accepted token skips signup and login. A rejected token usually
+        means the dev DB was wiped and the test user is gone, so it falls
+        back to the full signup + login flow.
+        """
+        cached_token = self._load_cached_token()
+        if cached_token:
+            log.info("\n🔑 Trying cached token...")
+            self._set_token(cached_token)
+            data = await self._req("GET", "/auth/me", allow=(401, 403))
+            if data:
+                self.user_id = data["id"]
+                log.info("✅ Cached token accepted, skipping signup and login")
+                return
+            log.warning("⚠️  Cached token rejected, signing up and logging in again")
+            self.client.headers.pop("authorization", None)
+
+        await self.test_signup()
+        await self.test_login()
+        await self.test_get_me()
+
+    async def _req(self, method: str, url: str, *, body=None, expect: int = 200, allow: tuple = (), **kwargs):
+        """
+        Send a request, assert its status and decode the JSON body
+
+        `body` is sent as JSON (a dict is serialized with orjson; bytes are
+        sent as-is). Statuses in `allow` return None instead of failing.
+        """
+        if body is not None:
+            kwargs["content"] = body if isinstance(body, bytes) else orjson.dumps(body)
+            kwargs["headers"] = JSON_HEADERS
+        async with self._limit or nullcontext():
+            response = await self.client.request(method, url, **kwargs)
+        if response.status_code in allow:
+            return None
+        assert response.status_code == expect, (
+            f"{method} {url} returned {response.status_code}: {response.text[:200]}"
+        )
+        return orjson.loads(response.content) if response.content else None
 
     async def test_health(self):
         """Test API health endpoint"""
-        print("\n🔍 Testing Health Endpoint...")
-        response = await self.client.get("/")
-        assert response.status_code == 200
-        data = response.json()
-        print(f"✅ Health check passed: {data}")
+        log.info("\n🔍 Testing Health Endpoint...")
+        data = await self._req("GET", "/")
+        log.info(f"✅ Health check passed: {data}")
         return data
 
     async def test_signup(self):
         """Test user signup"""
-        print("\n📝 Testing User Signup...")
-        response = await self.client.post(
-            "/auth/signup",
-            json={
-                "email": TEST_EMAIL,
-                "password": TEST_PASSWORD,
-                "name": TEST_NAME
-            }
-        )
-        
-        # User might already exist
-        if response.status_code == 400:
-            print("⚠️  User already exists, will test login instead")
+        log.info("\n📝 Testing User Signup...")
+        # User might already exist (400)
+        data = await self._req("POST", "/auth/signup", body=_SIGNUP_BODY, allow=(400,))
+        if data is None:
+            log.warning("⚠️  User already exists, will test login instead")
             return None
         
-        assert response.status_code == 200
-        data = response.json()
-        print(f"✅ Signup successful: {data['email']}")
+        log.info(f"✅ Signup successful: {data['email']}")
         return data
 
     async def test_login(self):
         """Test user login"""
-        print("\n🔐 Testing User Login...")
-        response = await self.client.post(
+        log.info("\n🔐 Testing User Login...")
+        data = await self._req(
+            "POST",
             "/auth/login",
             data={
                 "username": TEST_EMAIL,
                 "password": TEST_PASSWORD
             }
         )
-        assert response.status_code == 200
-        data = response.json()
-        self.token = data["access_token"]
-        print(f"✅ Login successful, token obtained")
+        self._set_token(data["access_token"])
+        self._save_cached_token()
+        log.info(f"✅ Login successful, token obtained")
         return data
 
     async def test_get_me(self):
         """Test get current user"""
-        print("\n👤 Testing Get Current User...")
-        response = await self.client.get(
-            "/auth/me",
-            headers={"Authorization": f"Bearer {self.token}"}
-        )
-        assert response.status_code == 200
-        data = response.json()
+        log.info("\n👤 Testing Get Current User...")
+        data = await self._req("GET", "/auth/me")
         self.user_id = data["id"]
-        print(f"✅ User info retrieved: {data['email']}, Tokens: {data['tokens_remaining']}")
+        log.info(f"✅ User info retrieved: {data['email']}, Tokens: {data['tokens_remaining']}")
         return data
 
-    async def test_create_project(self, prompt: str = "Create a beautiful todo list app with dark mode"):
-        """Test project creation"""
-        print(f"\n🚀 Testing Project Creation...")
-        print(f"   Prompt: {prompt}")
+    async def test_create_project(self, prompt: str = "Create a beautiful todo list app with dark mode", remember: bool = True):
+        """Test project creation (remember=False leaves self.chat_id untouched)"""
+        log.info(f"\n🚀 Testing Project Creation...")
+        log.info(f"   Prompt: {prompt}")
         
-        response = await self.client.post(
-            "/chat",
-            json={"prompt": prompt},
-            headers={"Authorization": f"Bearer {self.token}"}
-        )
-        assert response.status_code == 200
-        data = response.json()
-        self.chat_id = data["chat_id"]
-        print(f"✅ Project created: {self.chat_id}")
-        print(f"   Title: {data.get('title', 'N/A')}")
+        data = await self._req("POST", "/chat", body={"prompt": prompt})
+        if remember:
+            self.chat_id = data["chat_id"]
+        log.info(f"✅ Project created: {data['chat_id']}")
+        log.info(f"   Title: {data.get('title', 'N/A')}")
         return data
 
+    async def _stream_items(self, url: str, prefix: str, keep: int = 0):
+        """
+        Count the items of a JSON array in a response without buffering the body
+
+        Only the first `keep` items are retained; the rest are parsed
+        incrementally and dropped.
+        """
+        count = 0
+        kept = []
+        events = ijson.sendable_list()
+        parser = ijson.items_coro(events, prefix)
+        async with self._limit or nullcontext(), self.client.stream("GET", url) as response:
+            assert response.status_code == 200, f"GET {url} returned {response.status_code}"
+            async for chunk in response.aiter_bytes():
+                parser.send(chunk)
+                for item in events:
+                    count += 1
+                    if len(kept) < keep:
+                        kept.append(item)
+                del events[:]
+        parser.close()
+        return count, kept
+
     async def test_get_projects(self):
         """Test getting user projects"""
-        print("\n📋 Testing Get Projects...")
-        response = await self.client.get(
-            "/projects",
-            headers={"Authorization": f"Bearer {self.token}"}
-        )
-        assert response.status_code == 200
-        data = response.json()
-        print(f"✅ Found {len(data)} project(s)")
-        for project in data[:3]:  # Show first 3
-            print(f"   - {project['title']} ({project['id']})")
-        return data
+        log.info("\n📋 Testing Get Projects...")
+        count, preview = await self._stream_items("/projects", "projects.item", keep=3)
+        log.info(f"✅ Found {count} project(s)")
+        for project in preview:  # Show first 3
+            log.info(f"   - {project['title']} ({project['id']})")
+        return preview
 
-    async def test_get_chat_messages(self):
+    async def test_get_chat_messages(self, chat_id: Optional[str] = None):
         """Test getting chat messages"""
-        if not self.chat_id:
-            print("⚠️  No chat_id available, skipping message test")
+        chat_id = chat_id or self.chat_id
+        if not chat_id:
+            log.warning("⚠️  No chat_id available, skipping message test")
             return None
         
-        print(f"\n💬 Testing Get Chat Messages for {self.chat_id}...")
-        response = await self.client.get(
-            f"/chats/{self.chat_id}/messages",
-            headers={"Authorization": f"Bearer {self.token}"}
-        )
-        assert response.status_code == 200
-        data = response.json()
-        print(f"✅ Found {len(data.get('messages', []))} message(s)")
-        return data
+        log.info(f"\n💬 Testing Get Chat Messages for {chat_id}...")
+        count, _ = await self._stream_items(f"/chats/{chat_id}/messages", "messages.item")
+        log.info(f"✅ Found {count} message(s)")
+        return count
 
-    async def test_get_project_files(self):
+    async def test_get_project_files(self, chat_id: Optional[str] = None):
         """Test getting project files"""
-        if not self.chat_id:
-            print("⚠️  No chat_id available, skipping files test")
+        chat_id = chat_id or self.chat_id
+        if not chat_id:
+            log.warning("⚠️  No chat_id available, skipping files test")
             return None
         
-        print(f"\n📁 Testing Get Project Files...")
-        response = await self.client.get(
-            f"/projects/{self.chat_id}/files",
-            headers={"Authorization": f"Bearer {self.token}"}
-        )
-        
-        # Files might not exist yet
-        if response.status_code == 404:
-            print("⚠️  No files found yet (project might be building)")
+        log.info(f"\n📁 Testing Get Project Files...")
+        # The sandbox may still be coming up; the poll's own response is the result
+        data = await self._wait_for_files(chat_id)
+        if data is None:
+            log.warning("⚠️  No files found yet (project might be building)")
             return None
         
-        assert response.status_code == 200
-        data = response.json()
-        print(f"✅ Found {len(data.get('files', []))} file(s)")
+        log.info(f"✅ Found {len(data.get('files', []))} file(s)")
         for file in data.get('files', [])[:5]:  # Show first 5
-            print(f"   - {file}")
+            log.info(f"   - {file}")
         return data
 
+    async def _wait_for_files(self, chat_id: str, timeout: float = 10.0):
+        """
+        Poll the files endpoint with exponential backoff until it returns 200
+
+        Returns the decoded files response, or None if it was still 404 at
+        timeout. Any other status fails the calling test.
+        """
+        log.info("\n⏳ Waiting for project to initialize...")
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        delay = 0.25
+        while True:
+            data = await self._req("GET", f"/projects/{chat_id}/files", allow=(404,))
+            if data is not None:
+                return data
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                log.warning(f"⚠️  Files not ready after {timeout:.0f}s")
+                return None
+            await asyncio.sleep(min(delay, remaining))
+            delay *= 2
+
+    async def _run(self, name: str, coro):
+        """Await one test and record (name, passed, detail) instead of aborting the suite"""
+        try:
+            await coro
+        except AssertionError as e:
+            self.results.append((name, False, str(e) or "assertion failed"))
+            log.error(f"\n❌ {name} failed: {str(e) or 'assertion failed'}")
+        except Exception as e:
+            self.results.append((name, False, f"{type(e).__name__}: {e}"))
+            log.error(f"\n❌ {name} errored: {e}")
+        else:
+            self.results.append((name, True, ""))
+
     async def run_basic_tests(self):
         """Run basic API tests"""
-        print("\n" + "="*60)
-        print("🧪 RUNNING BASIC API TESTS")
-        print("="*60)
+        log.info("\n" + "="*60)
+        log.info("🧪 RUNNING BASIC API TESTS")
+        log.info("="*60)
+        
+        # Test authentication (sequential: each step needs the previous one)
+        await self._run("authenticate", self.authenticate())
+        
+        # Test projects (sets self.chat_id for the reads below)
+        await self._run("create_project", self.test_create_project(PROMPTS[0]))
+        
+        # Independent read-only checks run concurrently; _run keeps one
+        # failure from cancelling or hiding the others
+        await asyncio.gather(
+            self._run("health", self.test_health()),
+            self._run("get_projects", self.test_get_projects()),
+            self._run("get_chat_messages", self.test_get_chat_messages()),
+        )
         
+        # Polls until the sandbox is up instead of sleeping a fixed time first
+        await self._run("get_project_files", self.test_get_project_files())
+
+    async def run_prompt_matrix(self, prompts: list[str]):
+        """Create a project per prompt and check its files, reusing the logged-in client"""
+        for prompt in prompts:
+            await self._run(f"create_project[{prompt[:30]}]", self.test_create_project(prompt))
+            await self._run(f"get_project_files[{prompt[:30]}]", self.test_get_project_files())
+
+    async def run_load(self, prompts: list[str], concurrency: int):
+        """
+        Run a create/read scenario per prompt with at most `concurrency` requests in flight
+
+        Every request takes a permit from a shared semaphore, so back-off
+        sleeps while waiting for files hold none. Scenarios keep their own
+        chat_id and leave self.chat_id alone; the follow-up reads for a chat
+        are gathered together.
+        """
+        self._limit = asyncio.Semaphore(concurrency)
+
+        async def scenario(prompt: str):
+            data = await self.test_create_project(prompt, remember=False)
+            chat_id = data["chat_id"]
+            await asyncio.gather(
+                self.test_get_chat_messages(chat_id),
+                self.test_get_project_files(chat_id),
+            )
+
         try:
-            # Test health
-            await self.test_health()
-            
-            # Test authentication
-            await self.test_signup()
-            await self.test_login()
-            await self.test_get_me()
-            
-            # Test projects
-            await self.test_create_project()
-            await self.test_get_projects()
-            await self.test_get_chat_messages()
-            
-            # Wait a bit for file generation
-            print("\n⏳ Waiting 5 seconds for project to initialize...")
-            await asyncio.sleep(5)
-            
-            await self.test_get_project_files()
-            
-            print("\n" + "="*60)
-            print("✅ ALL BASIC TESTS PASSED!")
-            print("="*60)
-            
-        except AssertionError as e:
-            print(f"\n❌ Test failed: {e}")
-            raise
-        except Exception as e:
-            print(f"\n❌ Unexpected error: {e}")
-            raise
+            await asyncio.gather(*(self._run(f"load[{prompt[:30]}]", scenario(prompt)) for prompt in prompts))
+        finally:
+            self._limit = None
+
+    def report(self) -> bool:
+        """Print every recorded result; return True if all passed"""
+        failed = [r for r in self.results if not r[1]]
+        log.info("\n" + "="*60)
+        log.info(f"🧾 RESULTS: {len(self.results) - len(failed)} passed, {len(failed)} failed")
+        log.info("="*60)
+        for name, passed, detail in self.results:
+            log.info(f"{'✅' if passed else '❌'} {name}" + (f": {detail}" if detail else ""))
+        return not failed
 
     async def test_dapp_creation(self, prompt: str = "Create a simple ERC20 token contract"):
         """Test DApp creation (requires AcademicChain integration)"""
-        print("\n" + "="*60)
-        print("🧪 TESTING DAPP CREATION")
-        print("="*60)
-        
-        print(f"\n🏗️  Creating DApp...")
-        print(f"   Prompt: {prompt}")
+        log.info("\n" + "="*60)
+        log.info("🧪 TESTING DAPP CREATION")
+        log.info("="*60)
         
-        response = await self.client.post(
-            "/dapp/create",
-            json={
-                "prompt": prompt,
-                "network": "basecamp-testnet"
-            },
-            headers={"Authorization": f"Bearer {self.token}"}
-        )
+        log.info(f"\n🏗️  Creating DApp...")
+        log.info(f"   Prompt: {prompt}")
         
-        if response.status_code == 200:
-            data = response.json()
-            print(f"✅ DApp creation started: {data.get('chat_id')}")
-            print(f"   Connect to WebSocket to monitor progress")
-            return data
-        else:
-            print(f"⚠️  DApp creation failed: {response.status_code}")
-            print(f"   Response: {response.text}")
-            return None
+        # A failure status is reported (with the response body) by _req
+        data = await self._req("POST", "/dapp/create", body={"prompt": prompt, "network": "basecamp-testnet"})
+        log.info(f"✅ DApp creation started: {data.get('chat_id')}")
+        log.info(f"   Connect to WebSocket to monitor progress")
+        return data
 
 
-async def main():
-    """Main test runner"""
+async def main(test_dapp: bool = False, concurrency: int = 1) -> int:
+    """Main test runner; returns the process exit code"""
     tester = WebBuilderTester()
     
     try:
         # Run basic tests
         await tester.run_basic_tests()
         
+        # Remaining prompts reuse the same connection pool and token
+        if concurrency > 1:
+            await tester.run_load(PROMPTS[1:], concurrency)
+        else:
+            await tester.run_prompt_matrix(PROMPTS[1:])
+        
         # Optionally test DApp creation
-        print("\n" + "="*60)
-        test_dapp = input("\n🤔 Do you want to test DApp creation? (y/n): ")
-        if test_dapp.lower() == 'y':
-            await tester.test_dapp_creation()
+        if test_dapp:
+            await tester._run("dapp_creation", tester.test_dapp_creation())
         
-        print("\n🎉 All tests completed!")
+        if tester.report():
+            log.info("\n🎉 All tests completed!")
+            return 0
+        return 1
         
     except Exception as e:
-        print(f"\n❌ Test suite failed: {e}")
+        log.error(f"\n❌ Test suite failed: {e}")
+        return 1
     finally:
         await tester.close()
+        await close_http_client()
+        _log_buffer.flush()
 
 
 if __name__ == "__main__":
-    print("""
+    parser = argparse.ArgumentParser(description="WebBuilder API test suite")
+    parser.add_argument("--dapp", action="store_true", help="also test DApp creation")
+    parser.add_argument(
+        "--concurrency", type=int, default=1,
+        help="run the extra TEST_PROMPTS scenarios with up to N requests in flight"
+    )
+    args = parser.parse_args()
+    
+    log.info("""
 ╔═══════════════════════════════════════════════════════════╗
 ║           WebBuilder API Test Suite                      ║
 ║  Comprehensive testing for authentication and projects    ║
 ╚═══════════════════════════════════════════════════════════╝
     """)
     
-    asyncio.run(main())
+    # uvloop ships with uvicorn[standard] on non-Windows platforms
+    run = asyncio.run
+    if sys.platform != "win32":
+        try:
+            import uvloop
+            run = uvloop.run
+        except ImportError:
+            pass
+    
+    sys.exit(run(main(test_dapp=args.dapp, concurrency=args.concurrency)))